@@ -18,17 +18,38 @@ class RecipeFilter(filters.FilterSet):
         model = Recipe
         fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
 
-    def filter_is_favorited(self, queryset, name, value):
+    def filter_queryset(self, queryset):
+        """Без заданных фильтров не прогоняем queryset через каждый из них."""
+        data = self.form.cleaned_data
+        if (
+            not data.get('is_favorited')
+            and not data.get('is_in_shopping_cart')
+            and not data.get('tags')
+            and data.get('author') is None
+        ):
+            return queryset
+        return super().filter_queryset(queryset)
+
+    def _filter_by_flag(self, queryset, flag, lookup):
+        """Фильтр по флагу: по аннотации из вьюсета, иначе через JOIN."""
         user = getattr(self.request, 'user', None)
-        if value and user and user.is_authenticated:
-            return queryset.filter(bookmarks__user=user)
-        return queryset
+        if not user or not user.is_authenticated:
+            return queryset
+        if flag in queryset.query.annotations:
+            return queryset.filter(**{flag: True})
+        return queryset.filter(**{lookup: user})
+
+    def filter_is_favorited(self, queryset, name, value):
+        if not value:
+            return queryset
+        return self._filter_by_flag(
+            queryset, 'is_favorited', 'bookmarks__user')
 
     def filter_in_cart(self, queryset, name, value):
-        user = getattr(self.request, 'user', None)
-        if value and user and user.is_authenticated:
-            return queryset.filter(cart_items__user=user)
-        return queryset
+        if not value:
+            return queryset
+        return self._filter_by_flag(
+            queryset, 'is_in_shopping_cart', 'cart_items__user')
 
 
 class IngredientFilter(django_filters.FilterSet):
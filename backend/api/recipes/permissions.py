@@ -14,6 +14,6 @@ class IsAuthorOrAdminOrReadOnly(BasePermission):
             return True
 
         user = request.user
-        author_id = getattr(obj, 'author_id', None)
-        is_author = user.is_authenticated and author_id == user.id
-        return is_author or (user and user.is_superuser)
+        if not user.is_authenticated:
+            return False
+        return obj.author_id == user.id or user.is_superuser
@@ -1,12 +1,12 @@
 from api.users.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Bookmark, CartItem, Ingredient, IngredientAmount,
-                            Recipe, Tag)
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from backend.constants import (MAX_COOKING_TIME, MAX_INGREDIENT_AMOUNT,
-                               MIN_AMOUNT, MIN_COOKING_TIME)
+from backend.constants import (BULK_BATCH_SIZE, MAX_COOKING_TIME,
+                               MAX_INGREDIENT_AMOUNT, MIN_AMOUNT,
+                               MIN_COOKING_TIME)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -39,17 +39,40 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class IngredientAmountListSerializer(serializers.ListSerializer):
+    """Список ингредиентов: все id проверяем одним запросом."""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        found = Ingredient.objects.in_bulk(
+            {item['ingredient'] for item in items})
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist']
+        errors = []
+        for item in items:
+            ingredient = found.get(item['ingredient'])
+            if ingredient is None:
+                errors.append(
+                    {'id': [message.format(pk_value=item['ingredient'])]})
+                continue
+            item['ingredient'] = ingredient
+            errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+
 class IngredientAmountInputSerializer(serializers.Serializer):
     """Ввод ингредиента при создании/обновлении рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient',
-    )
+    id = serializers.IntegerField(source='ingredient')
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT, max_value=MAX_INGREDIENT_AMOUNT
     )
 
+    class Meta:
+        list_serializer_class = IngredientAmountListSerializer
+
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Короткая карточка рецепта (для избранного/корзины и т.п.)."""
@@ -62,15 +85,27 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeAuthorSerializer(UserSerializer):
+    """Автор рецепта; подписку берём из аннотации author_is_subscribed."""
+
+    def get_attribute(self, instance):
+        author = super().get_attribute(instance)
+        flag = getattr(instance, 'author_is_subscribed', None)
+        if flag is not None:
+            author.is_subscribed = flag
+        return author
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Детальная карточка рецепта."""
 
-    author = UserSerializer(read_only=True)
+    author = RecipeAuthorSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     ingredients = IngredientAmountSerializer(source='ingredient_amounts',
                                              many=True, read_only=True)
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True, default=False)
+    is_in_shopping_cart = serializers.BooleanField(
+        read_only=True, default=False)
 
     class Meta:
         model = Recipe
@@ -80,24 +115,6 @@ class RecipeSerializer(serializers.ModelSerializer):
             'text', 'image', 'cooking_time',
         )
 
-    def get_is_favorited(self, obj):
-        annotated = getattr(obj, 'is_favorited', None)
-        if annotated is not None:
-            return bool(annotated)
-        user = self.context.get('request').user
-        if not user or user.is_anonymous:
-            return False
-        return user.bookmarks.filter(recipe=obj).exists()
-
-    def get_is_in_shopping_cart(self, obj):
-        annotated = getattr(obj, 'is_in_shopping_cart', None)
-        if annotated is not None:
-            return bool(annotated)
-        user = self.context.get('request').user
-        if not user or user.is_anonymous:
-            return False
-        return user.cart_items.filter(recipe=obj).exists()
-
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Создание / обновление рецепта."""
@@ -127,17 +144,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             return ingredients
         if not ingredients:
             raise ValidationError('Нужно добавить хотя бы один ингредиент.')
-        ids = [item['ingredient'].id for item in ingredients]
-        if len(ids) != len(set(ids)):
-            raise ValidationError('Ингредиенты должны быть уникальными.')
+        seen = set()
         for it in ingredients:
-            amt = it.get('amount')
-            if amt is None or (
-                    not (MIN_AMOUNT <= int(amt) <= MAX_INGREDIENT_AMOUNT)):
-                raise ValidationError(
-                    'Количество для ингредиента должно быть '
-                    f'в диапазоне {MIN_AMOUNT}…{MAX_INGREDIENT_AMOUNT}.'
-                )
+            ingredient_id = it['ingredient'].id
+            if ingredient_id in seen:
+                raise ValidationError('Ингредиенты должны быть уникальными.')
+            seen.add(ingredient_id)
         return ingredients
 
     def validate_tags(self, tags):
@@ -146,9 +158,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             return tags
         if not tags:
             raise serializers.ValidationError('Выберите минимум один тег.')
-        ids = [t.id for t in tags]
-        if len(ids) != len(set(ids)):
-            raise serializers.ValidationError('Теги должны быть уникальными.')
+        seen = set()
+        for tag in tags:
+            if tag.id in seen:
+                raise serializers.ValidationError(
+                    'Теги должны быть уникальными.')
+            seen.add(tag.id)
         return tags
 
     def validate(self, attrs):
@@ -178,57 +193,89 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def _set_tags_and_ingredients(self, recipe, tags_data, ingredients_data):
-        """Единая точка обновления M2M и through-модели."""
+    def _set_tags_and_ingredients(self, recipe, tags_data, ingredients_data,
+                                  created=False):
+        """Единая точка обновления M2M и through-модели.
+
+        У только что созданного рецепта связей нет, поэтому их не читаем.
+        """
         if tags_data is not None:
-            recipe.tags.set(tags_data)
+            if created:
+                recipe.tags.add(*tags_data)
+            else:
+                recipe.tags.set(tags_data)
         if ingredients_data is not None:
-            recipe.ingredient_amounts.all().delete()
-            IngredientAmount.objects.bulk_create([
-                IngredientAmount(
-                    recipe=recipe,
-                    ingredient=item['ingredient'],
-                    amount=item['amount'],
-                )
-                for item in ingredients_data
-            ])
+            self._sync_ingredient_amounts(
+                recipe, ingredients_data, created=created)
+
+    @staticmethod
+    def _sync_ingredient_amounts(recipe, ingredients_data, created=False):
+        """Пишем в through-модель только добавленные/изменённые/удалённые."""
+        existing = {} if created else {
+            ingredient_id: (pk, amount)
+            for ingredient_id, amount, pk in
+            recipe.ingredient_amounts.values_list(
+                'ingredient_id', 'amount', 'id')
+        }
+        wanted = {
+            item['ingredient'].id: item['amount']
+            for item in ingredients_data
+        }
+        to_delete = [
+            pk for ingredient_id, (pk, _) in existing.items()
+            if ingredient_id not in wanted
+        ]
+        to_create = [
+            IngredientAmount(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in wanted.items()
+            if ingredient_id not in existing
+        ]
+        to_update = [
+            IngredientAmount(pk=existing[ingredient_id][0], amount=amount)
+            for ingredient_id, amount in wanted.items()
+            if ingredient_id in existing
+            and existing[ingredient_id][1] != amount
+        ]
+        if to_delete:
+            IngredientAmount.objects.filter(id__in=to_delete).delete()
+        if to_create:
+            IngredientAmount.objects.bulk_create(
+                to_create, batch_size=BULK_BATCH_SIZE)
+        if to_update:
+            IngredientAmount.objects.bulk_update(
+                to_update, ['amount'], batch_size=BULK_BATCH_SIZE)
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients', [])
         tags_data = validated_data.pop('tags', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._set_tags_and_ingredients(recipe, tags_data, ingredients_data)
+        self._set_tags_and_ingredients(
+            recipe, tags_data, ingredients_data, created=True)
         return recipe
 
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
-        instance = super().update(instance, validated_data)
+        validated_data.pop('author', None)
+        changed = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        if changed:
+            for field in changed:
+                setattr(instance, field, validated_data[field])
+            instance.save(update_fields=changed)
         self._set_tags_and_ingredients(instance, tags_data, ingredients_data)
         return instance
 
     def to_representation(self, instance):
         """После create/update отдаём полную карточку, как на GET"""
-        return RecipeSerializer(instance, context=self.context).data
-
-
-class _UserRecipeLinkBaseSerializer(serializers.ModelSerializer):
-    """Базовый сериалайзер: проставляет user из request."""
-
-    class Meta:
-        fields = ('id', 'recipe')
-        read_only_fields = ('id',)
-
-    def create(self, validated_data):
-        user = self.context['request'].user
-        return self.Meta.model.objects.create(user=user, **validated_data)
-
-
-class BookmarkCreateSerializer(_UserRecipeLinkBaseSerializer):
-    class Meta(_UserRecipeLinkBaseSerializer.Meta):
-        model = Bookmark
-
-
-class CartItemCreateSerializer(_UserRecipeLinkBaseSerializer):
-    class Meta(_UserRecipeLinkBaseSerializer.Meta):
-        model = CartItem
+        request = self.context.get('request')
+        recipe = (
+            Recipe.objects
+            .with_details()
+            .with_user_flags(getattr(request, 'user', None))
+            .get(pk=instance.pk)
+        )
+        return RecipeSerializer(recipe, context=self.context).data
@@ -0,0 +1,28 @@
+import string
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+_BASE62_INDEX = {char: i for i, char in enumerate(BASE62_ALPHABET)}
+
+
+def encode_base62(number: int) -> str:
+    """Кодирует неотрицательное целое в строку base62."""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    chars = []
+    while number:
+        number, rem = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[rem])
+    return ''.join(reversed(chars))
+
+
+def decode_base62(code: str) -> int:
+    """Декодирует строку base62; ValueError для посторонних символов."""
+    if not code:
+        raise ValueError('Пустой код.')
+    number = 0
+    for char in code:
+        try:
+            number = number * 62 + _BASE62_INDEX[char]
+        except KeyError:
+            raise ValueError(f'Недопустимый символ: {char!r}')
+    return number
@@ -1,27 +1,51 @@
 from http import HTTPStatus
 
-from api.recipes.serializers import (BookmarkCreateSerializer,
-                                     CartItemCreateSerializer,
-                                     IngredientSerializer,
+from api.recipes.serializers import (IngredientSerializer,
                                      RecipeCreateSerializer, RecipeSerializer,
                                      ShortRecipeSerializer, TagSerializer)
 from django.conf import settings
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from recipes.models import (Bookmark, CartItem, Ingredient, IngredientAmount,
+                            Recipe, Tag)
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from backend.pagination import CustomPageNumberPagination
+from backend.constants import (REFERENCE_CACHE_ALIAS, REFERENCE_CACHE_TIMEOUT,
+                               SHOPPING_LIST_CHUNK_SIZE)
+from backend.pagination import RecipePagination
 
 from .filters import IngredientFilter, RecipeFilter
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .utils import decode_base62, encode_base62
 
+FRONTEND_BASE = (settings.FRONTEND_URL or '').rstrip('/')
 
+
+def short_link_redirect(request, code):
+    """Перенаправляет короткую ссылку на страницу рецепта."""
+    try:
+        pk = decode_base62(code)
+    except ValueError:
+        raise Http404
+    if not Recipe.objects.filter(pk=pk).exists():
+        raise Http404
+    return redirect(f'{FRONTEND_BASE}/recipes/{pk}')
+
+
+@method_decorator(
+    cache_page(REFERENCE_CACHE_TIMEOUT, cache=REFERENCE_CACHE_ALIAS),
+    name='list',
+)
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Отдаёт список тегов (например: Завтрак, Обед, Ужин)."""
 
@@ -31,6 +55,10 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
+@method_decorator(
+    cache_page(REFERENCE_CACHE_TIMEOUT, cache=REFERENCE_CACHE_ALIAS),
+    name='list',
+)
 class IngredientViewSet(mixins.ListModelMixin,
                         mixins.RetrieveModelMixin,
                         viewsets.GenericViewSet):
@@ -43,19 +71,37 @@ class IngredientViewSet(mixins.ListModelMixin,
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Список для автодополнения — словари без создания моделей."""
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = IngredientSerializer.Meta.fields
+        return Response(list(queryset.values(*fields)))
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """CRUD для рецептов."""
 
-    queryset = Recipe.objects.select_related('author').prefetch_related(
-        'tags', 'ingredient_amounts__ingredient'
-    )
+    queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    permission_classes = [IsAuthorOrAdminOrReadOnly]
+    permission_classes = (IsAuthorOrAdminOrReadOnly,)
     parser_classes = (JSONParser, MultiPartParser, FormParser)
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
+
+    _short_card_actions = {
+        'favorite', 'delete_favorite', 'shopping_cart', 'delete_shopping_cart',
+    }
+
+    def get_queryset(self):
+        """Связи и флаги подгружаем только там, где отдаём полную карточку."""
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.with_details().with_user_flags(self.request.user)
+        if self.action in self._short_card_actions:
+            return queryset.only(
+                'id', 'name', 'image', 'cooking_time', 'author_id')
+        return queryset
 
     def get_serializer_class(self):
         """Для POST/PUT/PATCH используем отдельный сериализатор."""
@@ -77,48 +123,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, pk=None):
         """Возвращает ссылку на рецепт."""
-        recipe = self.get_object()
-        base = (settings.FRONTEND_URL
-                or request.build_absolute_uri('/')).rstrip('/')
-        url = f'{base}/recipes/{recipe.id}'
-        return Response({'short-link': url}, status=HTTPStatus.OK)
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        base = FRONTEND_BASE or request.build_absolute_uri('/').rstrip('/')
+        url = f'{base}/r/{encode_base62(recipe.id)}/'
+        return JsonResponse({'short-link': url}, status=HTTPStatus.OK)
 
     def _toggle_relation(
         self,
         request,
         *,
-        serializer_class,
+        model,
         recipe,
         add: bool,
         already_message: str = '',
         absent_message: str = '',
     ):
-        """DRY для избранного и корзины через сериалайзер."""
+        """DRY для избранного и корзины."""
         if add:
-            serializer = serializer_class(
-                data={'recipe': recipe.id},
-                context={'request': request},
-            )
-            serializer.is_valid(raise_exception=False)
-            if serializer.errors:
-                return Response({'detail': already_message},
-                                status=status.HTTP_400_BAD_REQUEST)
             try:
-                serializer.save()
-            except Exception:
+                with transaction.atomic():
+                    model.objects.create(user=request.user, recipe=recipe)
+            except IntegrityError:
                 return Response({'detail': already_message},
                                 status=status.HTTP_400_BAD_REQUEST)
             data = ShortRecipeSerializer(
                 recipe, context={'request': request}).data
             return Response(data, status=status.HTTP_201_CREATED)
 
-        deleted, _ = serializer_class.Meta.model.objects.filter(
+        deleted, _ = model.objects.filter(
             user=request.user, recipe=recipe
         ).delete()
         if not deleted:
             return Response({'detail': absent_message},
                             status=status.HTTP_400_BAD_REQUEST)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
 
     @action(
         detail=True,
@@ -130,7 +168,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         return self._toggle_relation(
             request,
-            serializer_class=BookmarkCreateSerializer,
+            model=Bookmark,
             recipe=recipe,
             add=True,
             already_message='Рецепт уже в избранном',
@@ -142,7 +180,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         return self._toggle_relation(
             request,
-            serializer_class=BookmarkCreateSerializer,
+            model=Bookmark,
             recipe=recipe,
             add=False,
             absent_message='Рецепта нет в избранном',
@@ -158,7 +196,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         return self._toggle_relation(
             request,
-            serializer_class=CartItemCreateSerializer,
+            model=CartItem,
             recipe=recipe,
             add=True,
             already_message='Рецепт уже в списке покупок',
@@ -170,26 +208,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         return self._toggle_relation(
             request,
-            serializer_class=CartItemCreateSerializer,
+            model=CartItem,
             recipe=recipe,
             add=False,
             absent_message='Рецепта нет в списке покупок',
         )
 
-    def _build_shopping_list(self, user) -> bytes:
+    def _iter_shopping_list(self, user):
+        """Построчно отдаёт список покупок, не собирая его в памяти."""
         items = (
             IngredientAmount.objects
             .filter(recipe__cart_items__user=user)
-            .values(
-                name=F('ingredient__name'),
-                unit=F('ingredient__measurement_unit'),
-            )
+            .values_list(
+                'ingredient__name', 'ingredient__measurement_unit')
             .annotate(total=Sum('amount'))
-            .order_by('name')
+            .order_by('ingredient__name')
         )
-        lines = [f"{it['name']} — {it['total']} {it['unit']}" for it in items]
-        content = '\n'.join(lines) or 'Список покупок пуст.'
-        return content.encode('utf-8')
+        empty = True
+        for name, unit, total in items.iterator(
+                chunk_size=SHOPPING_LIST_CHUNK_SIZE):
+            empty = False
+            yield f'{name} — {total} {unit}\n'.encode('utf-8')
+        if empty:
+            yield 'Список покупок пуст.'.encode('utf-8')
 
     @action(
         detail=False,
@@ -199,9 +240,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         """Txt-файл со всеми ингредиентами из рецептов в корзине."""
-        payload = self._build_shopping_list(request.user)
-        response = HttpResponse(
-            payload, content_type='text/plain; charset=utf-8')
+        response = StreamingHttpResponse(
+            self._iter_shopping_list(request.user),
+            content_type='text/plain; charset=utf-8',
+        )
         response['Content-Disposition'] = (
             'attachment; filename="shopping_list.txt"'
         )
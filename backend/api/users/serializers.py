@@ -1,24 +1,109 @@
-import imghdr
+from copy import copy, deepcopy
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import Recipe
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from users.models import Follow
 
 from backend.constants import MAX_PHOTO_SIZE_BYTES
 
 User = get_user_model()
 
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
 
-class UserSerializer(serializers.ModelSerializer):
+
+def _copy_field(field):
+    """Копия поля для экземпляра; составные поля копируем глубоко.
+
+    У ListField, ManyRelatedField и вложенных сериализаторов есть дочерние
+    поля, которые bind() иначе перепривязал бы между экземплярами.
+    """
+    if isinstance(field, (serializers.BaseSerializer,
+                          serializers.ListField,
+                          serializers.DictField,
+                          serializers.ManyRelatedField)):
+        return deepcopy(field)
+    return copy(field)
+
+
+class CachedFieldsMixin:
+    """Собирает поля сериализатора один раз на класс.
+
+    Экземпляр получает копии, которые DRF затем привязывает.
+    """
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        cached = self._fields_cache.get(cls)
+        if cached is None:
+            cached = super().get_fields()
+            self._fields_cache[cls] = cached
+        return {name: _copy_field(field) for name, field in cached.items()}
+
+
+def absolute_url_prefix(request):
+    """Схема и хост запроса для сборки абсолютных ссылок на медиа."""
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def absolute_media_url(file, prefix):
+    """Абсолютная ссылка на файл; уже абсолютные ссылки не трогаем."""
+    if not file:
+        return None
+    url = file.url
+    if '://' in url:
+        return url
+    return prefix + url
+
+
+def context_url_prefix(context):
+    """Префикс ссылок для контекста сериализатора; считаем его один раз."""
+    prefix = context.get('_url_prefix')
+    if prefix is None:
+        request = context.get('request')
+        prefix = absolute_url_prefix(request) if request is not None else ''
+        context['_url_prefix'] = prefix
+    return prefix
+
+
+def short_recipe_to_dict(recipe, prefix):
+    """Краткая карточка рецепта словарём, как у ShortRecipeSerializer."""
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'image': absolute_media_url(recipe.image, prefix),
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def followed_author_ids(request):
+    """Id авторов, на которых подписан пользователь; один запрос на запрос."""
+    ids = getattr(request, '_followed_ids', None)
+    if ids is None:
+        ids = request._followed_ids = set(
+            request.user.subscriptions.values_list('author_id', flat=True))
+    return ids
+
+
+class AvatarField(serializers.ImageField):
+    """Аватар с абсолютной ссылкой; префикс считаем раз на сериализацию."""
+
+    def to_representation(self, value):
+        return absolute_media_url(value, context_url_prefix(self.context))
+
+
+class UserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для отображения информации о пользователе."""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = serializers.ImageField(
-        read_only=True, allow_null=True, required=False)
+    avatar = AvatarField(read_only=True, allow_null=True, required=False)
 
     class Meta:
         model = User
@@ -26,17 +111,51 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'email', 'username', 'first_name',
             'last_name', 'avatar', 'is_subscribed',
         )
+        read_only_fields = fields
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get('is_subscribed_annotated'):
+            fields['is_subscribed'] = serializers.BooleanField(read_only=True)
+        return fields
+
+    @staticmethod
+    def to_fast_dict(user, prefix):
+        """Пользователь словарём, без прохода по полям DRF."""
+        return {
+            'id': user.id,
+            'email': user.email,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'avatar': absolute_media_url(user.avatar, prefix),
+            'is_subscribed': bool(getattr(user, 'is_subscribed', False)),
+        }
+
+    @staticmethod
+    def to_fast_list(users, request):
+        """Список пользователей без прохода по полям DRF.
+
+        Рассчитан на queryset с аннотацией is_subscribed из UserViewSet.
+        """
+        prefix = absolute_url_prefix(request)
+        to_dict = UserSerializer.to_fast_dict
+        return [to_dict(user, prefix) for user in users]
 
     def get_is_subscribed(self, obj):
         """Проверяет, подписан ли текущий пользователь на данного автора."""
+        annotated = getattr(obj, 'is_subscribed', None)
+        if annotated is not None:
+            return bool(annotated)
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or user.is_anonymous or user == obj:
             return False
-        return user.subscriptions.filter(author=obj).exists()
+        return obj.pk in followed_author_ids(request)
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(CachedFieldsMixin,
+                                 serializers.ModelSerializer):
     """Сериализатор для регистрации нового пользователя."""
 
     password = serializers.CharField(
@@ -65,40 +184,52 @@ class SubscriptionSerializer(UserSerializer):
     """Сериализатор для отображения информации о подписке."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(read_only=True, default=0)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count',)
+        read_only_fields = fields
 
     def get_recipes(self, obj):
         """Возвращает список рецептов автора."""
-        from api.recipes.serializers import ShortRecipeSerializer
-
-        queryset = Recipe.objects.filter(author=obj)
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit') if request else None
-        if isinstance(limit, str) and limit.isdigit():
-            n = int(limit)
-            if n >= 0:
-                queryset = queryset[:n]
-
-        return ShortRecipeSerializer(queryset, many=True,
-                                     context={'request': request}).data
+        queryset = obj.recipes.all()
+        limit = self.context.get('recipes_limit')
+        if limit is not None:
+            queryset = queryset[:limit]
+        prefix = context_url_prefix(self.context)
+        return [short_recipe_to_dict(recipe, prefix) for recipe in queryset]
+
+    @staticmethod
+    def subscription_to_fast_dict(author, request, recipes_limit=None):
+        """Подписка словарём, без прохода по полям DRF.
+
+        Рассчитан на автора из UserViewSet.get_queryset с prefetch рецептов.
+        """
+        prefix = absolute_url_prefix(request)
+        data = UserSerializer.to_fast_dict(author, prefix)
+        recipes = author.recipes.all()
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        data['recipes'] = [
+            short_recipe_to_dict(recipe, prefix) for recipe in recipes]
+        data['recipes_count'] = author.recipes_count
+        return data
 
 
 class FollowCreateSerializer(serializers.ModelSerializer):
-    """Сериалайзер для создания подписки на автора."""
+    """Сериалайзер для создания подписки на автора.
 
-    author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    Автора передаёт view в context['author'], уже загруженным.
+    """
 
     class Meta:
         model = Follow
-        fields = ('author',)
+        fields = ()
 
     def validate(self, attrs):
         request = self.context.get('request')
         user = getattr(request, 'user', None)
-        author = attrs.get('author')
+        author = self.context['author']
 
         if user is None or user.is_anonymous:
             raise serializers.ValidationError('Требуется аутентификация.')
@@ -107,23 +238,40 @@ class FollowCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Нельзя подписаться на самого себя.')
 
-        if Follow.objects.filter(subscriber=user, author=author).exists():
-            raise serializers.ValidationError(
-                'Вы уже подписаны на этого автора.')
-
         return attrs
 
     def create(self, validated_data):
         user = self.context['request'].user
-        author = validated_data['author']
-        return Follow.objects.create(subscriber=user, author=author)
+        author = self.context['author']
+        try:
+            with transaction.atomic():
+                return Follow.objects.create(subscriber=user, author=author)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже подписаны на этого автора.'],
+            })
+
+
+class AvatarBase64ImageField(Base64ImageField):
+    """Base64-картинка с проверкой размера до декодирования."""
+
+    TOO_LARGE_MESSAGE = 'Файл слишком большой (макс. 5 МБ).'
+
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            payload = base64_data.rpartition(';base64,')[2]
+            if len(payload) * 3 // 4 > MAX_PHOTO_SIZE_BYTES:
+                raise serializers.ValidationError(self.TOO_LARGE_MESSAGE)
+        return super().to_internal_value(base64_data)
 
 
-class AvatarUploadSerializer(serializers.Serializer):
+class AvatarUploadSerializer(CachedFieldsMixin, serializers.Serializer):
     """Сериализатор для загрузки/обновления аватара пользователя."""
 
-    avatar = Base64ImageField(required=True)
+    avatar = AvatarBase64ImageField(required=True)
     MAX_SIZE = MAX_PHOTO_SIZE_BYTES
+    HEADER_SIZE = len(PNG_SIGNATURE)
 
     class Meta:
         model = User
@@ -131,28 +279,22 @@ class AvatarUploadSerializer(serializers.Serializer):
 
     def validate_avatar(self, file_obj):
         """Проверяет размер и формат загружаемого изображения (JPG или PNG)."""
-        size = getattr(file_obj, 'size', None)
-        if size is not None and size > self.MAX_SIZE:
-            raise ValidationError('Файл слишком большой (макс. 5 МБ).')
-
-        try:
-            data_reader = getattr(file_obj, 'read', None)
-            raw = data_reader() if callable(data_reader) else getattr(
-                file_obj, 'file', None).read()
-        except Exception:
-            raw = None
-
-        kind = imghdr.what(None, h=raw) if raw else None
-        if kind not in ('jpeg', 'png'):
+        if file_obj is None:
             raise ValidationError('Допустимы только JPG или PNG.')
+        if file_obj.size > self.MAX_SIZE:
+            raise ValidationError(AvatarBase64ImageField.TOO_LARGE_MESSAGE)
 
-        if callable(getattr(file_obj, 'seek', None)):
-            file_obj.seek(0)
+        file_obj.seek(0)
+        header = file_obj.read(self.HEADER_SIZE)
+        file_obj.seek(0)
+
+        if not header.startswith((JPEG_SIGNATURE, PNG_SIGNATURE)):
+            raise ValidationError('Допустимы только JPG или PNG.')
 
         return file_obj
 
     def update(self, instance, validated_data):
         """Обновляет аватар пользователя."""
         instance.avatar = validated_data['avatar']
-        instance.save(update_fields=['avatar'])
+        instance.save(update_fields=['avatar', 'updated_at'])
         return instance
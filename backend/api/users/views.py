@@ -3,18 +3,31 @@ from http import HTTPStatus
 from api.users.serializers import (AvatarUploadSerializer,
                                    FollowCreateSerializer,
                                    SubscriptionSerializer,
-                                   UserRegistrationSerializer, UserSerializer)
+                                   UserRegistrationSerializer, UserSerializer,
+                                   absolute_url_prefix)
 from django.contrib.auth.password_validation import validate_password
-from django.db.models import Count
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from recipes.models import Recipe
 from rest_framework import filters, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from users.models import Follow, User
 
-from backend.pagination import CustomPageNumberPagination
+from backend.pagination import (CustomPageNumberPagination,
+                                PkNarrowingPageNumberPagination)
+
+
+def profile_etag(request, *args, **kwargs):
+    """ETag профиля: меняется при каждом сохранении пользователя."""
+    user = request.user
+    return f'{user.pk}-{user.updated_at.timestamp()}'
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -26,52 +39,104 @@ class UserViewSet(viewsets.ModelViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username', 'email', 'first_name', 'last_name')
     pagination_class = CustomPageNumberPagination
+    throttle_scope = None
+
+    _read_actions = {'list', 'retrieve', 'subscriptions', 'subscribe'}
+    _read_fields = (
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+    )
 
     _auth_required = {
         'me', 'avatar', 'avatar_delete', 'subscribe',
         'unsubscribe', 'subscriptions', 'set_password'
     }
+    _serializer_classes = {
+        'create': UserRegistrationSerializer,
+        'subscriptions': SubscriptionSerializer,
+        'subscribe': SubscriptionSerializer,
+        'avatar': AvatarUploadSerializer,
+    }
+
+    def get_queryset(self):
+        """Подписку и рецепты авторов считаем в одном запросе со списком."""
+        queryset = super().get_queryset()
+        if self.action in self._read_actions:
+            queryset = queryset.only(*self._read_fields)
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(subscriber=user, author=OuterRef('pk'))
+            ))
+        else:
+            queryset = queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        if self.action in ('subscriptions', 'subscribe'):
+            queryset = queryset.only(
+                *self._read_fields, 'recipes_count',
+            ).prefetch_related(Prefetch(
+                'recipes',
+                queryset=Recipe.objects.only(
+                    'id', 'name', 'image', 'cooking_time', 'author_id'),
+            ))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self._read_actions:
+            context['is_subscribed_annotated'] = True
+        if self.action in ('subscriptions', 'subscribe'):
+            limit = self.request.query_params.get('recipes_limit', '')
+            context['recipes_limit'] = int(limit) if limit.isdigit() else None
+        return context
 
     def get_permissions(self):
         """Возвращает права доступа в зависимости от action"""
-        if self.action == 'create':
-            return [AllowAny()]
         if self.action in self._auth_required:
             return [IsAuthenticated()]
         return [AllowAny()]
 
     def get_serializer_class(self):
         """Возвращает сериализатор в зависимости от action"""
-        if self.action == 'create':
-            return UserRegistrationSerializer
-        if self.action in ('subscriptions', 'subscribe'):
-            return SubscriptionSerializer
-        if self.action == 'avatar':
-            return AvatarUploadSerializer
-        return UserSerializer
+        return self._serializer_classes.get(self.action, UserSerializer)
+
+    def list(self, request, *args, **kwargs):
+        """Список пользователей собираем без сериализатора DRF."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                UserSerializer.to_fast_list(page, request))
+        return Response(UserSerializer.to_fast_list(queryset, request))
 
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated]
     )
+    @method_decorator(vary_on_headers('Authorization'))
+    @method_decorator(condition(etag_func=profile_etag))
     def me(self, request):
         """Возвращает данные текущего пользователя."""
-        return Response(
-            UserSerializer(request.user, context={'request': request}).data
-        )
+        return Response(UserSerializer.to_fast_dict(
+            request.user, absolute_url_prefix(request)))
 
     @action(
         detail=False,
         methods=['post'],
         url_path='set_password',
         permission_classes=[IsAuthenticated],
+        throttle_classes=[ScopedRateThrottle],
+        throttle_scope='set_password',
     )
     def set_password(self, request):
         """Изменяет пароль текущего пользователя"""
         current_password = (request.data.get('current_password') or '').strip()
         new_password = (request.data.get('new_password') or '').strip()
 
+        if not current_password:
+            raise serializers.ValidationError(
+                {'current_password': 'Обязательное поле.'}
+            )
         if not request.user.check_password(current_password):
             raise serializers.ValidationError(
                 {'current_password': 'Неверный текущий пароль.'}
@@ -79,7 +144,8 @@ class UserViewSet(viewsets.ModelViewSet):
 
         validate_password(new_password, user=request.user)
         request.user.set_password(new_password)
-        request.user.save(update_fields=['password'])
+        User.objects.filter(pk=request.user.pk).update(
+            password=request.user.password)
         return Response(status=HTTPStatus.NO_CONTENT)
 
     @action(
@@ -91,10 +157,7 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def avatar(self, request):
         """Загружает или обновляет аватар пользователя"""
-        if (
-            'avatar' not in request.data
-            and 'avatar' not in getattr(request, 'FILES', {})
-        ):
+        if 'avatar' not in request.data:
             return Response(
                 {'avatar': ['Это поле обязательно.']},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -113,10 +176,17 @@ class UserViewSet(viewsets.ModelViewSet):
     @avatar.mapping.delete
     def avatar_delete(self, request):
         """Удаляет аватар пользователя."""
-        if request.user.avatar:
-            request.user.avatar.delete(save=True)
+        user = request.user
+        if user.avatar:
+            user.avatar.delete(save=False)
+            user.save(update_fields=['avatar', 'updated_at'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def _get_author_or_404(pk):
+        """Автор нужен только как id для связи Follow."""
+        return get_object_or_404(User.objects.only('id'), pk=pk)
+
     @action(
         detail=True,
         methods=['post'],
@@ -124,30 +194,28 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def subscribe(self, request, pk=None):
         """Оформляет подписку на выбранного автора."""
-        author = get_object_or_404(User, pk=pk)
+        author = get_object_or_404(self.get_queryset(), pk=pk)
 
         create_serializer = FollowCreateSerializer(
-            data={'author': author.id},
-            context={'request': request},
+            data={},
+            context={'request': request, 'author': author},
         )
         create_serializer.is_valid(raise_exception=True)
         create_serializer.save()
-        author_annotated = (
-            User.objects.annotate(recipes_count=Count(
-                'recipes')).get(pk=author.pk)
-        )
-        data = SubscriptionSerializer(author_annotated, context={
-                                      'request': request}).data
+        author.is_subscribed = True
+        data = SubscriptionSerializer.subscription_to_fast_dict(
+            author, request,
+            self.get_serializer_context()['recipes_limit'])
         return Response(data, status=HTTPStatus.CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, pk=None):
         """Отписывает текущего пользователя от выбранного автора"""
-        author = get_object_or_404(User, pk=pk)
         deleted, _ = Follow.objects.filter(
-            subscriber=request.user, author=author
+            subscriber=request.user, author_id=pk
         ).delete()
         if not deleted:
+            self._get_author_or_404(pk)
             return Response(
                 {'detail': 'Подписка на этого автора отсутствует.'},
                 status=HTTPStatus.BAD_REQUEST
@@ -157,23 +225,21 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        pagination_class=PkNarrowingPageNumberPagination,
     )
     def subscriptions(self, request):
         """Возвращает список авторов, на которых подписан пользователь."""
-        authors = (
-            User.objects
-            .filter(subscribers__subscriber=request.user)
-            .annotate(recipes_count=Count('recipes'))
-            .distinct()
-        )
+        authors = self.get_queryset().filter(
+            is_subscribed=True).order_by('id')
 
-        page = self.paginate_queryset(authors)
+        page = self.paginator.paginate_queryset(
+            authors, request, view=self,
+            count_queryset=Follow.objects.filter(subscriber=request.user),
+        )
         if page is not None:
-            serializer = SubscriptionSerializer(
-                page, many=True, context={'request': request})
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
 
-        serializer = SubscriptionSerializer(
-            authors, many=True, context={'request': request})
+        serializer = self.get_serializer(authors, many=True)
         return Response(serializer.data)
@@ -14,3 +14,8 @@ USER_EMAIL_MAX_LEN = 254
 USER_USERNAME_MAX_LEN = 150
 USER_FIRST_NAME_MAX_LEN = 150
 USER_LAST_NAME_MAX_LEN = 150
+BULK_BATCH_SIZE = 100
+REFERENCE_CACHE_TIMEOUT = 60 * 15
+REFERENCE_CACHE_ALIAS = 'reference'
+LOAD_BATCH_SIZE = 1000
+SHOPPING_LIST_CHUNK_SIZE = 500
@@ -1,4 +1,8 @@
-from rest_framework.pagination import PageNumberPagination
+from functools import partial
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from backend.constants import DEFAULT_PAGE_SIZE, MAX_DEFAULT_PAGE_SIZE
 
@@ -7,3 +11,73 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = MAX_DEFAULT_PAGE_SIZE
+
+
+class PkNarrowingPaginator(Paginator):
+    """Сначала pk страницы узким запросом, затем сами строки по pk__in.
+
+    count_queryset позволяет посчитать строки по более дешёвой таблице.
+    """
+
+    def __init__(self, *args, count_queryset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_queryset = count_queryset
+
+    @cached_property
+    def count(self):
+        if self.count_queryset is not None:
+            return self.count_queryset.count()
+        return super().count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        pks = list(self.object_list.values_list('pk', flat=True)[bottom:top])
+        by_pk = {obj.pk: obj for obj in self.object_list.filter(pk__in=pks)}
+        objects = [by_pk[pk] for pk in pks if pk in by_pk]
+        return self._get_page(objects, number, self)
+
+
+class PkNarrowingPageNumberPagination(CustomPageNumberPagination):
+    django_paginator_class = PkNarrowingPaginator
+
+    def paginate_queryset(self, queryset, request, view=None,
+                          count_queryset=None):
+        self.django_paginator_class = partial(
+            PkNarrowingPaginator, count_queryset=count_queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсор по (-created_at, -id): глубокие страницы без OFFSET."""
+
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_DEFAULT_PAGE_SIZE
+    ordering = ('-created_at', '-id')
+
+
+class RecipePagination(CustomPageNumberPagination):
+    """Номера страниц по умолчанию, курсор — если передан ?cursor=."""
+
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor = RecipeCursorPagination()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor is not None:
+            return self.cursor.to_html()
+        return super().to_html()
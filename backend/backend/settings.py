@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -99,6 +100,21 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Общий для всех воркеров gunicorn и management-команд контейнера,
+    # чтобы сброс кеша в одном процессе был виден остальным.
+    'reference': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'REFERENCE_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'foodgram_reference_cache'),
+        ),
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -156,6 +172,13 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_PAGINATION_CLASS': 'backend.pagination.CustomPageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'drf_orjson_renderer.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'set_password': '10/minute',
+    },
 }
 
 
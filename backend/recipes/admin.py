@@ -17,6 +17,7 @@ class IngredientAdmin(admin.ModelAdmin):
     list_display_links = ('name',)
     search_fields = ('name',)
     ordering = ('name',)
+    show_full_result_count = False
 
 
 class IngredientAmountInline(admin.TabularInline):
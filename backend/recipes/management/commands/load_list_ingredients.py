@@ -1,9 +1,13 @@
 import json
 from pathlib import Path
 
+from django.core.cache import caches
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+from backend.constants import LOAD_BATCH_SIZE, REFERENCE_CACHE_ALIAS
+
 
 class Command(BaseCommand):
     help = "Загрузка ингредиентов из списка"
@@ -26,10 +30,17 @@ class Command(BaseCommand):
         if not isinstance(data, list):
             raise CommandError("Ожидался список объектов.")
 
+        existing = {
+            name.casefold(): (pk, mu)
+            for pk, name, mu in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit")
+        }
         seen = set()
-        created = updated = skipped = 0
+        to_create = []
+        to_update = []
+        skipped = 0
 
-        for i, item in enumerate(data, 1):
+        for item in data:
             name = (item.get("name") or "").strip()
             mu = (item.get("measurement_unit") or "").strip()
 
@@ -43,21 +54,25 @@ class Command(BaseCommand):
                 continue
             seen.add(key)
 
-            obj, is_new = Ingredient.objects.get_or_create(
-                name=name,
-                defaults={"measurement_unit": mu}
-            )
-            if is_new:
-                created += 1
+            if key not in existing:
+                to_create.append(Ingredient(name=name, measurement_unit=mu))
                 continue
-
-            if opts["update"] and obj.measurement_unit != mu:
-                obj.measurement_unit = mu
-                obj.save(update_fields=["measurement_unit"])
-                updated += 1
+            pk, current_mu = existing[key]
+            if opts["update"] and current_mu != mu:
+                to_update.append(Ingredient(pk=pk, measurement_unit=mu))
             else:
                 skipped += 1
 
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                to_create, batch_size=LOAD_BATCH_SIZE)
+            Ingredient.objects.bulk_update(
+                to_update, ["measurement_unit"], batch_size=LOAD_BATCH_SIZE)
+        # bulk-операции не шлют сигналов: сбрасываем кеш списков сами.
+        if to_create or to_update:
+            caches[REFERENCE_CACHE_ALIAS].clear()
+        created, updated = len(to_create), len(to_update)
+
         self.stdout.write(self.style.SUCCESS(
             f"Готово: создано {created}, "
             f"обновлено {updated}, пропущено {skipped}"
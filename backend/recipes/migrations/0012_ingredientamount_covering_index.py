@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-14 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredientamount',
+            index=models.Index(fields=['recipe', 'ingredient'], include=('amount',), name='ia_recipe_ingr_idx'),
+        ),
+    ]
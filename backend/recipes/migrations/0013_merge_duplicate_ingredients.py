@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-14 07:20
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    groups = Ingredient.objects.values('name', 'measurement_unit').annotate(
+        kept_id=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    for group in groups:
+        kept_id = group['kept_id']
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(pk=kept_id).values_list('pk', flat=True))
+        kept_recipe_ids = IngredientAmount.objects.filter(
+            ingredient_id=kept_id).values('recipe_id')
+        duplicates = IngredientAmount.objects.filter(
+            ingredient_id__in=duplicate_ids)
+        # Рецепт уже ссылается на оставляемый ингредиент: дубль удаляем,
+        # иначе перенос нарушит уникальность пары рецепт-ингредиент.
+        duplicates.filter(recipe_id__in=kept_recipe_ids).delete()
+        # Среди дублей рецепт тоже мог встречаться несколько раз.
+        moved = set()
+        for amount in duplicates.order_by('pk').only('pk', 'recipe_id'):
+            if amount.recipe_id in moved:
+                amount.delete()
+                continue
+            moved.add(amount.recipe_id)
+            IngredientAmount.objects.filter(pk=amount.pk).update(
+                ingredient_id=kept_id)
+        Ingredient.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_ingredientamount_covering_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-14 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookmark',
+            index=models.Index(fields=['recipe', 'user'], name='bookmark_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['recipe', 'user'], name='cartitem_recipe_user_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              UniqueConstraint, Value)
+from django.db.models.functions import Upper
+from users.models import Follow
 
 from backend.constants import (INGREDIENT_NAME_MAX_LEN,
                                INGREDIENT_UNIT_MAX_LEN, MAX_COOKING_TIME,
@@ -35,11 +39,59 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = [
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit',
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_name_trgm',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.measurement_unit})'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы рецептов для отдачи через API."""
+
+    def with_details(self):
+        """Автор, теги и ингредиенты — без N+1 при сериализации."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient').order_by('id'),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """Флаги избранного, корзины и подписки подзапросами в SELECT."""
+        if not user or not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Bookmark.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                CartItem.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Follow.objects.filter(
+                    subscriber=user, author=OuterRef('author_id'))
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -80,6 +132,8 @@ class Recipe(models.Model):
         auto_now_add=True, db_index=True, verbose_name='Опубликовано'
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -119,6 +173,13 @@ class IngredientAmount(models.Model):
                 name='unique_recipe_ingredient',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='ia_recipe_ingr_idx',
+            ),
+        ]
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
 
@@ -152,6 +213,10 @@ class Bookmark(UserRecipeLinkBase):
             UniqueConstraint(fields=['user', 'recipe'],
                              name='unique_user_recipe_favorite'),
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='bookmark_recipe_user_idx'),
+        ]
         default_related_name = 'bookmarks'
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -168,6 +233,10 @@ class CartItem(UserRecipeLinkBase):
             UniqueConstraint(fields=['user', 'recipe'],
                              name='unique_user_recipe_cart'),
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='cartitem_recipe_user_idx'),
+        ]
         default_related_name = 'cart_items'
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
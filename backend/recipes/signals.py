@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipe, Tag
+
+from backend.constants import REFERENCE_CACHE_ALIAS
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_reference_cache(sender, **kwargs):
+    """Сбрасывает закешированные списки тегов и ингредиентов."""
+    caches[REFERENCE_CACHE_ALIAS].clear()
+
+
+def _shift_recipes_count(author_id, delta):
+    """Атомарно сдвигает счётчик рецептов автора, не опуская ниже нуля."""
+    authors = User.objects.filter(pk=author_id)
+    if delta < 0:
+        authors = authors.filter(recipes_count__gte=-delta)
+    authors.update(recipes_count=F('recipes_count') + delta)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_author(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежнего автора, чтобы перенести счётчик при смене."""
+    instance._old_author_id = None
+    if instance.pk is None or (
+            update_fields is not None and 'author' not in update_fields):
+        return
+    instance._old_author_id = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values_list('author_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipes_count(sender, instance, created, **kwargs):
+    """Ведёт счётчик рецептов автора при создании и смене автора."""
+    if created:
+        _shift_recipes_count(instance.author_id, 1)
+        return
+    old_author_id = getattr(instance, '_old_author_id', None)
+    if old_author_id is not None and old_author_id != instance.author_id:
+        _shift_recipes_count(old_author_id, -1)
+        _shift_recipes_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счётчик рецептов автора при удалении рецепта."""
+    _shift_recipes_count(instance.author_id, -1)
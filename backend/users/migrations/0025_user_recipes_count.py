@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-14 07:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_recipes_count(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    counts = Recipe.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author').annotate(total=Count('pk')).values('total')
+    User.objects.update(recipes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0024_auto_20250830_0651'),
+        ('recipes', '0014_recipe_user_link_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(fill_recipes_count, migrations.RunPython.noop),
+    ]
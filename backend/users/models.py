@@ -34,6 +34,15 @@ class User(AbstractUser):
         upload_to='users/avatars/',
         blank=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
 
 
 class Follow(models.Model):